@@ -2,12 +2,18 @@
 # -*- coding: utf-8 -*-
 
 import os
+import re
 import abc
 import enum
 import json
+import zlib
+import shutil
 import typing
 import argparse
+import tempfile
+import multiprocessing
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
 
 
@@ -17,6 +23,7 @@ ReportFileDataType = dict[str, dict[str, ProcessDataType]]
 
 class ReportFileFormatsEnum(str, enum.Enum):
     JSON = "JSON"
+    JSON_SHARDED = "JSON_SHARDED"
 
 
 class ReportDataProcessorsEnum(str, enum.Enum):
@@ -100,6 +107,170 @@ class JSONReportFileWriter(AbcReportFileWriter):
             json.dump(data, ftw, indent=2)
 
 
+class JSONShardedReportFileWriter(AbcReportFileWriter):
+    FILE_EXT: str = ".json"
+    INDEX_FILENAME: str = "index.json"
+    TMP_DIR_PREFIX: str = ".tmp_"
+    SHARD_NAME_MAX_BYTES: int = 64
+    CHUNKS_PER_WORKER: int = 4
+    UNSAFE_FILENAME_CHARS = re.compile(r"[^\w.-]+")
+
+    def __init__(
+        self,
+        filename: str,
+        buckets: int = 0,
+        max_workers: int | None = None,
+    ):
+        """Initiates the sharded report writer
+
+        :param filename: str, Report directory name
+        :param buckets: int, Number of hash buckets, `0` - file per department
+        :param max_workers: int | None, Worker processes, `None` - CPU count
+        :returns: None
+        """
+        if buckets < 0:
+            raise ValueError("Количество шардов не может быть отрицательным")
+
+        if max_workers is not None and max_workers < 1:
+            raise ValueError("Количество воркеров должно быть больше нуля")
+
+        self.dirname = os.path.splitext(filename)[0]
+        self.filename = os.path.join(self.dirname, self.INDEX_FILENAME)
+        self.buckets = buckets
+        self.max_workers = max_workers
+
+    def get_shard_filename(self, department: str) -> str:
+        """Returns shard filename for the given `department`"""
+        # NOTE (ames0k0): `hash()` рандомизирован между запусками
+        checksum = zlib.crc32(department.encode())
+        if self.buckets:
+            return "bucket_%04d%s" % (checksum % self.buckets, self.FILE_EXT)
+
+        name = self.UNSAFE_FILENAME_CHARS.sub("_", department).strip("._")
+        # XXX (ames0k0): Лимит имени файла в байтах, а не в символах
+        name = (
+            name.encode()[: self.SHARD_NAME_MAX_BYTES]
+            .decode(errors="ignore")
+            .rstrip("._")
+        )
+        return "%s-%08x%s" % (name or "department", checksum, self.FILE_EXT)
+
+    def read_index(self) -> dict[str, str]:
+        """Returns the index of the previous report, if any"""
+        if not os.path.exists(self.filename):
+            return {}
+
+        with open(self.filename, "r") as ftr:
+            index = json.load(ftr)
+
+        if not isinstance(index, dict):
+            return {}
+
+        return {
+            department: shard_filename
+            for department, shard_filename in index.items()
+            if isinstance(shard_filename, str)
+        }
+
+    def write_shard(
+        self,
+        tmp_dirname: str,
+        shard_filename: str,
+        data: typing.Any,
+    ) -> None:
+        """Writes shard data to the temporary directory"""
+        with open(os.path.join(tmp_dirname, shard_filename), "w") as ftw:
+            json.dump(data, ftw, indent=2)
+
+    def write_shards(
+        self,
+        tmp_dirname: str,
+        shards: dict[str, ReportFileDataType],
+    ) -> None:
+        """Writes shards to the temporary directory"""
+        max_workers = min(
+            self.max_workers or os.cpu_count() or 1,
+            len(shards),
+        )
+        if max_workers <= 1:
+            for shard_filename, shard_data in shards.items():
+                self.write_shard(tmp_dirname, shard_filename, shard_data)
+            return
+
+        # XXX (ames0k0)
+        # `json.dump(indent=2)` идёт через Python энкодер и держит GIL,
+        # поэтому шарды сериализуются в отдельных процессах, пачками
+        chunksize = max(
+            1,
+            len(shards) // (max_workers * self.CHUNKS_PER_WORKER),
+        )
+        # NOTE (ames0k0)
+        # `fork` при живом потоке пула может зависнуть, поэтому `spawn`
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        ) as executor:
+            # NOTE (ames0k0): `list()` чтобы пробросить исключения воркеров
+            list(
+                executor.map(
+                    self.write_shard,
+                    [tmp_dirname] * len(shards),
+                    shards.keys(),
+                    shards.values(),
+                    chunksize=chunksize,
+                )
+            )
+
+    def remove_stale_shards(
+        self,
+        previous_index: dict[str, str],
+        index: dict[str, str],
+    ) -> None:
+        """Removes shards of the `previous_index` missing in the `index`"""
+        shard_filenames = set(index.values())
+        shard_filenames.add(self.INDEX_FILENAME)
+        for shard_filename in set(previous_index.values()) - shard_filenames:
+            # NOTE (ames0k0): Удаляем только файлы из своей папки
+            if os.path.basename(shard_filename) != shard_filename:
+                continue
+            shard_filepath = os.path.join(self.dirname, shard_filename)
+            if os.path.isfile(shard_filepath):
+                os.remove(shard_filepath)
+
+    def write(self, data: ReportFileDataType):
+        index: dict[str, str] = dict()
+        shards: dict[str, ReportFileDataType] = defaultdict(dict)
+        for department, report_per_department in data.items():
+            shard_filename = self.get_shard_filename(department)
+            index[department] = shard_filename
+            shards[shard_filename][department] = report_per_department
+
+        os.makedirs(self.dirname, exist_ok=True)
+        previous_index = self.read_index()
+
+        # NOTE (ames0k0)
+        # Все шарды и индекс сначала пишутся во временную папку,
+        # при ошибке предыдущий отчёт остаётся без изменений
+        tmp_dirname = tempfile.mkdtemp(
+            dir=self.dirname,
+            prefix=self.TMP_DIR_PREFIX,
+        )
+        try:
+            self.write_shards(tmp_dirname, shards)
+            self.write_shard(tmp_dirname, self.INDEX_FILENAME, index)
+
+            # XXX (ames0k0): Индекс переносится последним, после всех шардов
+            for shard_filename in (*shards, self.INDEX_FILENAME):
+                os.replace(
+                    os.path.join(tmp_dirname, shard_filename),
+                    os.path.join(self.dirname, shard_filename),
+                )
+        finally:
+            shutil.rmtree(tmp_dirname, ignore_errors=True)
+
+        self.remove_stale_shards(previous_index, index)
+
+
 class CalcEmployeePayout(AbcDataProcessor):
     def __init__(self):
         self.sum_hours: int = 0
@@ -218,6 +389,8 @@ class Report:
         report_filename: str,
         report_file_format: ReportFileFormatsEnum,
         report_by: list[ReportDataProcessorsEnum],
+        report_shards: int = 0,
+        report_workers: int | None = None,
     ):
         self.export_files_reader = self.get_export_files_reader(
             export_files=export_files,
@@ -225,6 +398,8 @@ class Report:
         self.report_file_writer = self.get_report_file_writer(
             report_filename=report_filename,
             report_file_format=report_file_format,
+            report_shards=report_shards,
+            report_workers=report_workers,
         )
         self.report_data_processors = self.get_report_processors(
             report_by=report_by,
@@ -269,7 +444,9 @@ class Report:
         self,
         report_filename: str,
         report_file_format: ReportFileFormatsEnum,
-    ) -> JSONReportFileWriter:
+        report_shards: int = 0,
+        report_workers: int | None = None,
+    ) -> JSONReportFileWriter | JSONShardedReportFileWriter:
         """Returns `report_file_writer` for the given `report_file_format`"""
         if not report_filename:
             raise ValueError("Необходимо передать название файла для отчёта")
@@ -277,8 +454,22 @@ class Report:
         if not report_file_format:
             raise ValueError("Необходимо передать формат файла для отчёта")
 
+        if report_file_format != ReportFileFormatsEnum.JSON_SHARDED and (
+            report_shards or report_workers is not None
+        ):
+            raise ValueError(
+                "Запись по шардам поддерживает только: %s"
+                % ReportFileFormatsEnum.JSON_SHARDED.value,
+            )
+
         if report_file_format == ReportFileFormatsEnum.JSON:
             return JSONReportFileWriter(filename=report_filename)
+        elif report_file_format == ReportFileFormatsEnum.JSON_SHARDED:
+            return JSONShardedReportFileWriter(
+                filename=report_filename,
+                buckets=report_shards,
+                max_workers=report_workers,
+            )
         else:
             raise ValueError(
                 "Запись файла не поддерживает: %s" % report_file_format,
@@ -370,13 +561,29 @@ if __name__ == "__main__":
                 "Скрипт подсчёта зарплаты сотрудников\n",
                 "Поддерживает чтение файлов: .csv",
                 "Поддерживает запись файлов: .json",
+                "Поддерживает запись по отделам: --shards [N]",
                 "Поддерживает генераторов отчёта: PAYOUT",
             )
         ),
-        usage="python main.py [export_file]... --report [report_filename]",
+        usage=(
+            "python main.py [export_file]... --report [report_filename]"
+            " [--shards [N]] [--workers N]"
+        ),
         epilog="python main.py data1.csv data2.csv data3.csv --report payout",
     )
     parser.add_argument("--report", help="Report filename")
+    parser.add_argument(
+        "--shards",
+        type=int,
+        nargs="?",
+        const=0,
+        help="Write report per department (or per N hash buckets)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="Worker processes to write report shards",
+    )
 
     args, export_files = parser.parse_known_args()
 
@@ -387,9 +594,15 @@ if __name__ == "__main__":
     report = Report(
         export_files=export_files,
         report_filename=args.report,
-        report_file_format=ReportFileFormatsEnum.JSON,
+        report_file_format=(
+            ReportFileFormatsEnum.JSON
+            if args.shards is None
+            else ReportFileFormatsEnum.JSON_SHARDED
+        ),
         report_by=[
             ReportDataProcessorsEnum.PAYOUT,
         ],
+        report_shards=args.shards or 0,
+        report_workers=args.workers,
     )
     report.generate()
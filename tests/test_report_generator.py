@@ -1,10 +1,13 @@
 import os
 import json
+import stat
+import shutil
+import tempfile
 
 import pytest
 
 from main import ReportFileFormatsEnum, ReportDataProcessorsEnum, ReportFileDataType
-from main import Report
+from main import Report, JSONReportFileWriter, JSONShardedReportFileWriter
 
 
 SETUP_FILES_TYPE = tuple[str, ...]
@@ -116,3 +119,216 @@ def test_with_report_file_generation_with_multiple_export_files(
     assert generated_report_data["HR"] == loaded_data_from_generated_file["HR"]
 
     os.remove(report.report_file_writer.filename)
+
+
+def test_with_sharded_report_file_generation_per_department(
+    setup_files: SETUP_FILES_TYPE,
+):
+    report = Report(
+        export_files=setup_files[:2],
+        report_filename=REPORT_FILENAME,
+        report_file_format=ReportFileFormatsEnum.JSON_SHARDED,
+        report_by=[ReportDataProcessorsEnum.PAYOUT],
+    )
+    report.generate()
+    assert isinstance(report.report_file_writer, JSONShardedReportFileWriter)
+
+    assert os.path.exists(report.report_file_writer.filename), (
+        "Индекс отчёта не был сформирован"
+    )
+
+    with open(report.report_file_writer.filename, "r") as ftr:
+        index: dict[str, str] = json.load(ftr)
+    assert sorted(index) == ["Design", "HR", "Marketing"]
+    assert len(set(index.values())) == 3
+
+    with open(os.path.join(report.report_file_writer.dirname, index["HR"])) as ftr:
+        assert json.load(ftr) == {
+            "HR": {
+                "Grace Lee": {"hours": 160, "rate": 45, "payout": "$7200"},
+                "Ivy Clark": {"hours": 158, "rate": 38, "payout": "$6004"},
+                "__summary__": {"hours": 318, "payout": "$13204"},
+            },
+        }
+
+    shutil.rmtree(report.report_file_writer.dirname)
+
+
+def test_with_sharded_report_file_generation_per_bucket(
+    setup_files: SETUP_FILES_TYPE,
+):
+    report = Report(
+        export_files=setup_files[:2],
+        report_filename=REPORT_FILENAME,
+        report_file_format=ReportFileFormatsEnum.JSON_SHARDED,
+        report_by=[ReportDataProcessorsEnum.PAYOUT],
+        report_shards=1,
+        report_workers=2,
+    )
+    report.generate()
+    assert isinstance(report.report_file_writer, JSONShardedReportFileWriter)
+
+    with open(report.report_file_writer.filename, "r") as ftr:
+        index: dict[str, str] = json.load(ftr)
+    assert set(index.values()) == {"bucket_0000.json"}
+
+    with open(os.path.join(report.report_file_writer.dirname, "bucket_0000.json")) as ftr:
+        loaded_data_from_generated_file = json.load(ftr)
+    assert sorted(loaded_data_from_generated_file) == ["Design", "HR", "Marketing"]
+
+    # NOTE (ames0k0): Временные файлы не должны оставаться
+    assert sorted(os.listdir(report.report_file_writer.dirname)) == [
+        "bucket_0000.json",
+        "index.json",
+    ]
+
+    shutil.rmtree(report.report_file_writer.dirname)
+
+
+def test_with_sharded_report_files_permissions():
+    data: ReportFileDataType = {
+        "HR": {"__summary__": {"hours": 0, "payout": "$0"}},
+    }
+    with tempfile.TemporaryDirectory() as dirname:
+        report_file_writer = JSONReportFileWriter(
+            filename=os.path.join(dirname, REPORT_FILENAME),
+        )
+        report_file_writer.write(data=data)
+        sharded_report_file_writer = JSONShardedReportFileWriter(
+            filename=os.path.join(dirname, "sharded"),
+        )
+        sharded_report_file_writer.write(data=data)
+
+        expected_mode = stat.S_IMODE(os.stat(report_file_writer.filename).st_mode)
+        for filename in os.listdir(sharded_report_file_writer.dirname):
+            filepath = os.path.join(sharded_report_file_writer.dirname, filename)
+            assert stat.S_IMODE(os.stat(filepath).st_mode) == expected_mode
+
+
+def test_with_sharded_report_file_long_department_name():
+    department = "Отдел продаж / " * 50
+    data: ReportFileDataType = {
+        department: {"__summary__": {"hours": 0, "payout": "$0"}},
+    }
+    with tempfile.TemporaryDirectory() as dirname:
+        report_file_writer = JSONShardedReportFileWriter(
+            filename=os.path.join(dirname, REPORT_FILENAME),
+        )
+        report_file_writer.write(data=data)
+
+        with open(report_file_writer.filename, "r") as ftr:
+            index: dict[str, str] = json.load(ftr)
+        shard_filename = index[department]
+        assert shard_filename.startswith("Отдел_продаж_")
+        assert len(shard_filename.encode()) <= 255
+
+        with open(os.path.join(report_file_writer.dirname, shard_filename)) as ftr:
+            assert json.load(ftr) == data
+
+
+def test_with_sharded_report_file_removes_stale_shards():
+    data: ReportFileDataType = {
+        department: {"__summary__": {"hours": 0, "payout": "$0"}}
+        for department in ("HR", "Design", "Marketing")
+    }
+    with tempfile.TemporaryDirectory() as dirname:
+        filename = os.path.join(dirname, REPORT_FILENAME)
+        JSONShardedReportFileWriter(filename=filename).write(data=data)
+        report_file_writer = JSONShardedReportFileWriter(
+            filename=filename,
+            buckets=1,
+        )
+        report_file_writer.write(data=data)
+
+        assert sorted(os.listdir(report_file_writer.dirname)) == [
+            "bucket_0000.json",
+            "index.json",
+        ]
+
+
+def test_with_sharded_report_file_failed_shard():
+    data: ReportFileDataType = {
+        "HR": {"__summary__": {"hours": 0, "payout": "$0"}},
+        # NOTE (ames0k0): `set` не сериализуется в JSON
+        "Design": {"__summary__": {"hours": {0}, "payout": "$0"}},  # type: ignore
+    }
+    with tempfile.TemporaryDirectory() as dirname:
+        # NOTE (ames0k0): Ошибка должна пробрасываться из процесса воркера
+        report_file_writer = JSONShardedReportFileWriter(
+            filename=os.path.join(dirname, REPORT_FILENAME),
+            max_workers=2,
+        )
+        with pytest.raises(TypeError) as excinfo:
+            report_file_writer.write(data=data)
+        assert excinfo.value.args[0] == "Object of type set is not JSON serializable"
+
+        # NOTE (ames0k0): Ни шардов, ни индекса, ни временных файлов
+        assert os.listdir(report_file_writer.dirname) == []
+
+
+def test_with_sharded_report_file_failed_shard_keeps_previous_report():
+    data: ReportFileDataType = {
+        department: {"__summary__": {"hours": 0, "payout": "$0"}}
+        for department in ("HR", "Design")
+    }
+    with tempfile.TemporaryDirectory() as dirname:
+        report_file_writer = JSONShardedReportFileWriter(
+            filename=os.path.join(dirname, REPORT_FILENAME),
+            max_workers=2,
+        )
+        report_file_writer.write(data=data)
+        filenames = sorted(os.listdir(report_file_writer.dirname))
+
+        failed_data: ReportFileDataType = {
+            "HR": {"__summary__": {"hours": 1, "payout": "$1"}},
+            "Design": {"__summary__": {"hours": {1}, "payout": "$1"}},  # type: ignore
+        }
+        with pytest.raises(TypeError):
+            report_file_writer.write(data=failed_data)
+
+        assert sorted(os.listdir(report_file_writer.dirname)) == filenames
+        with open(report_file_writer.filename, "r") as ftr:
+            index: dict[str, str] = json.load(ftr)
+        with open(os.path.join(report_file_writer.dirname, index["HR"])) as ftr:
+            assert json.load(ftr) == {"HR": data["HR"]}
+
+
+def test_with_sharded_report_file_keeps_unrelated_files():
+    data: ReportFileDataType = {
+        "HR": {"__summary__": {"hours": 0, "payout": "$0"}},
+    }
+    with tempfile.TemporaryDirectory() as dirname:
+        settings_filename = os.path.join(dirname, "settings.json")
+        with open(settings_filename, "w") as ftw:
+            json.dump({}, ftw)
+
+        # NOTE (ames0k0): Отчёт пишется в уже существующую папку
+        report_file_writer = JSONShardedReportFileWriter(filename=dirname)
+        report_file_writer.write(data=data)
+        report_file_writer.write(data=data)
+
+        assert os.path.exists(settings_filename)
+        assert len(os.listdir(dirname)) == 3
+
+
+def test_with_sharded_report_file_single_shard_without_pool(
+    monkeypatch: pytest.MonkeyPatch,
+):
+    def process_pool_executor(*args, **kwargs):
+        raise AssertionError("Пул процессов не должен запускаться")
+
+    monkeypatch.setattr("main.ProcessPoolExecutor", process_pool_executor)
+
+    data: ReportFileDataType = {
+        department: {"__summary__": {"hours": 0, "payout": "$0"}}
+        for department in ("HR", "Design", "Marketing")
+    }
+    with tempfile.TemporaryDirectory() as dirname:
+        report_file_writer = JSONShardedReportFileWriter(
+            filename=os.path.join(dirname, REPORT_FILENAME),
+            buckets=1,
+            max_workers=8,
+        )
+        report_file_writer.write(data=data)
+
+        assert os.path.exists(report_file_writer.filename)
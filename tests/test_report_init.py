@@ -84,3 +84,51 @@ def test_without_report_by(setup_files: SETUP_FILES_TYPE):
             report_by=[],
         )
     assert excinfo.value.args[0] == "Необходимо передать генераторов отчета"
+
+
+def test_with_negative_report_shards(setup_files: SETUP_FILES_TYPE):
+    with pytest.raises(ValueError) as excinfo:
+        Report(
+            export_files=setup_files[:1],
+            report_filename=REPORT_FILENAME,
+            report_file_format=ReportFileFormatsEnum.JSON_SHARDED,
+            report_by=[ReportDataProcessorsEnum.PAYOUT],
+            report_shards=-1,
+        )
+    assert excinfo.value.args[0] == "Количество шардов не может быть отрицательным"
+
+
+def test_with_report_shards_for_not_sharded_format(setup_files: SETUP_FILES_TYPE):
+    with pytest.raises(ValueError) as excinfo:
+        Report(
+            export_files=setup_files[:1],
+            report_filename=REPORT_FILENAME,
+            report_file_format=ReportFileFormatsEnum.JSON,
+            report_by=[ReportDataProcessorsEnum.PAYOUT],
+            report_shards=16,
+        )
+    assert excinfo.value.args[0] == "Запись по шардам поддерживает только: JSON_SHARDED"
+
+
+def test_with_report_workers_for_not_sharded_format(setup_files: SETUP_FILES_TYPE):
+    with pytest.raises(ValueError) as excinfo:
+        Report(
+            export_files=setup_files[:1],
+            report_filename=REPORT_FILENAME,
+            report_file_format=ReportFileFormatsEnum.JSON,
+            report_by=[ReportDataProcessorsEnum.PAYOUT],
+            report_workers=2,
+        )
+    assert excinfo.value.args[0] == "Запись по шардам поддерживает только: JSON_SHARDED"
+
+
+def test_with_wrong_report_workers(setup_files: SETUP_FILES_TYPE):
+    with pytest.raises(ValueError) as excinfo:
+        Report(
+            export_files=setup_files[:1],
+            report_filename=REPORT_FILENAME,
+            report_file_format=ReportFileFormatsEnum.JSON_SHARDED,
+            report_by=[ReportDataProcessorsEnum.PAYOUT],
+            report_workers=0,
+        )
+    assert excinfo.value.args[0] == "Количество воркеров должно быть больше нуля"
@@ -0,0 +1,212 @@
+import os
+import typing
+import tempfile
+import tracemalloc
+from dataclasses import dataclass
+
+import pytest
+
+from main import ReportFileFormatsEnum, ReportDataProcessorsEnum, ReportFileDataType
+from main import CSVExportFileReader, Data2Object, JSONReportFileWriter, Report
+
+
+REPORT_FILENAME = "payout_memory"
+
+ROWS_COUNT = 20_000
+DEPARTMENTS_COUNT = 50
+
+# NOTE (ames0k0): Бюджеты в байтах на строку экспорта (~1.3x от замеров)
+# Удвоение памяти любой стадии должно ронять тест, поэтому запас < 2x
+# Поднимать только осознанно, обновив замеры и описав причину в коммите
+# Замеры на Python 3.12.1 (README: 3.12.x), retained / peak байт на строку:
+#   CSVExportFileReader.stream            115.1 / 181.2
+#   Data2Object.dump                      128.8 / 136.8
+#   Report.group_employees_by_department  452.2 / 587.8
+#   JSONReportFileWriter.write              0.2 /   3.8
+READER_RETAINED_PER_ROW = 150.0
+READER_PEAK_PER_ROW = 236.0
+DATA2OBJECT_RETAINED_PER_ROW = 168.0
+DATA2OBJECT_PEAK_PER_ROW = 178.0
+GROUP_RETAINED_PER_ROW = 588.0
+GROUP_PEAK_PER_ROW = 764.0
+# NOTE (ames0k0): Writer почти ничего не удерживает (~4 КБ на весь отчёт),
+# поэтому к бюджету добавлен фиксированный запас от шума аллокатора
+WRITER_RETAINED_BASE = 16 * 1024
+WRITER_RETAINED_PER_ROW = 0.25
+WRITER_PEAK_PER_ROW = 5.0
+
+TOP_ALLOCATION_SITES = 10
+
+
+@dataclass
+class MemoryUsage:
+    retained: int
+    peak: int
+    snapshot: tracemalloc.Snapshot
+    baseline: tracemalloc.Snapshot
+
+    def breakdown(self) -> str:
+        """Returns top allocation sites grown during the stage"""
+        stats = self.snapshot.compare_to(self.baseline, "lineno")
+        return "\n".join(str(stat) for stat in stats[:TOP_ALLOCATION_SITES])
+
+
+def trace_memory(stage: typing.Callable[[], typing.Any]) -> MemoryUsage:
+    """Measures retained and peak memory of the given stage
+
+    Snapshot is taken when `stage` returns, the stage should keep
+    alive (return) everything it allocates to get a useful breakdown
+    """
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        start, _ = tracemalloc.get_traced_memory()
+
+        result = stage()
+
+        current, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+
+    del result
+    return MemoryUsage(
+        retained=current - start,
+        peak=peak - start,
+        snapshot=snapshot,
+        baseline=baseline,
+    )
+
+
+def assert_memory_budget(
+    stage_name: str,
+    usage: MemoryUsage,
+    retained_per_row: float,
+    peak_per_row: float,
+    retained_base: int = 0,
+) -> None:
+    """Checks memory usage of the stage against the per-row budgets"""
+    for kind, used, base, per_row in (
+        ("retained", usage.retained, retained_base, retained_per_row),
+        ("peak", usage.peak, 0, peak_per_row),
+    ):
+        budget = base + int(per_row * ROWS_COUNT)
+        assert used <= budget, (
+            "%s: превышен бюджет памяти (%s): %d > %d байт (%.2f > %.2f байт/строка)\n%s"
+            % (
+                stage_name,
+                kind,
+                used,
+                budget,
+                used / ROWS_COUNT,
+                per_row,
+                usage.breakdown(),
+            )
+        )
+
+
+@pytest.fixture(scope="module")
+def large_export_file() -> typing.Generator[str, None, None]:
+    """Создание большого файла экспорта для тестирования памяти"""
+    with tempfile.NamedTemporaryFile(
+        "w",
+        prefix="large_",
+        suffix=".csv",
+        delete=False,
+        delete_on_close=False,
+    ) as data:
+        data.write("id,email,name,department,hours_worked,hourly_rate\n")
+        for index in range(ROWS_COUNT):
+            data.write(
+                "%d,employee%d@example.com,Employee %d,Department %d,160,50\n"
+                % (index, index, index, index % DEPARTMENTS_COUNT)
+            )
+
+    yield data.name
+
+    os.remove(data.name)
+
+
+@pytest.fixture(scope="module")
+def large_export_rows(large_export_file: str) -> list[list[str]]:
+    return list(CSVExportFileReader(filepath=large_export_file).stream())
+
+
+def test_csv_export_file_reader_memory(large_export_file: str):
+    def stage() -> tuple[typing.Generator[list[str], None, None], list[str]]:
+        # NOTE (ames0k0): Держим поток открытым, чтобы попасть в снимок
+        rows = CSVExportFileReader(filepath=large_export_file).stream()
+        columns = next(rows)
+        return rows, columns
+
+    usage = trace_memory(stage)
+    assert_memory_budget(
+        "CSVExportFileReader.stream",
+        usage,
+        retained_per_row=READER_RETAINED_PER_ROW,
+        peak_per_row=READER_PEAK_PER_ROW,
+    )
+
+
+def test_data2object_memory(large_export_rows: list[list[str]]):
+    def stage() -> list:
+        data_to_object = Data2Object()
+        data_to_object.match_columns(columns=large_export_rows[0])
+        return [data_to_object.dump(row) for row in large_export_rows[1:]]
+
+    usage = trace_memory(stage)
+    assert_memory_budget(
+        "Data2Object.dump",
+        usage,
+        retained_per_row=DATA2OBJECT_RETAINED_PER_ROW,
+        peak_per_row=DATA2OBJECT_PEAK_PER_ROW,
+    )
+
+
+def test_group_employees_by_department_memory(large_export_file: str):
+    report = Report(
+        export_files=[large_export_file],
+        report_filename=REPORT_FILENAME,
+        report_file_format=ReportFileFormatsEnum.JSON,
+        report_by=[ReportDataProcessorsEnum.PAYOUT],
+    )
+
+    def stage() -> None:
+        report.group_employees_by_department(
+            file_reader=report.export_files_reader[0],
+        )
+
+    usage = trace_memory(stage)
+    assert len(report.loaded_employees_id) == ROWS_COUNT
+    assert_memory_budget(
+        "Report.group_employees_by_department",
+        usage,
+        retained_per_row=GROUP_RETAINED_PER_ROW,
+        peak_per_row=GROUP_PEAK_PER_ROW,
+    )
+
+
+def test_json_report_file_writer_memory():
+    data: ReportFileDataType = {
+        "Department %d" % department: {
+            "Employee %d" % index: {"hours": 160, "rate": 50, "payout": "$8000"}
+            for index in range(department, ROWS_COUNT, DEPARTMENTS_COUNT)
+        }
+        for department in range(DEPARTMENTS_COUNT)
+    }
+    with tempfile.TemporaryDirectory() as dirname:
+        report_file_writer = JSONReportFileWriter(
+            filename=os.path.join(dirname, REPORT_FILENAME),
+        )
+
+        usage = trace_memory(lambda: report_file_writer.write(data=data))
+        assert os.path.exists(report_file_writer.filename), "Отчёт не был сформирован"
+
+    assert_memory_budget(
+        "JSONReportFileWriter.write",
+        usage,
+        retained_per_row=WRITER_RETAINED_PER_ROW,
+        peak_per_row=WRITER_PEAK_PER_ROW,
+        retained_base=WRITER_RETAINED_BASE,
+    )